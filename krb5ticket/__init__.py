@@ -1,4 +1,15 @@
-from .errors import KeytabFileNotExists
+from .errors import (
+    KeytabFileNotExists,
+    KeytabFileEmpty,
+    KtutilCommandError,
+    KtutilUsageError,
+    KtutilKeytabError,
+    KtutilEntryError,
+    CcacheCollectionNotSupported,
+    CcacheNotDestroyed,
+)
 from .krb5 import Krb5
-from .ktutil import ktutil
-from .ktutil_helpers import create_entries, list_entries, delete_entries
\ No newline at end of file
+from .krb5_collection import Krb5Collection
+from .ktutil import ktutil, KtutilResult
+from .ktutil_helpers import create_entries, list_entries, delete_entries
+from .ktutil_rotation import rotate, RotationReport, RotationResult
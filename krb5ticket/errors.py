@@ -10,3 +10,62 @@ class KtutilCommandNotFound(RuntimeError):
     Raised when ``ktutil`` command-line interface not found.
     """
     pass
+
+
+class KtutilCommandError(RuntimeError):
+    """
+    Raised when one or more commands within a ``ktutil`` session fail.
+
+    :param message: error message.
+    :param results: list of failed ``KtutilResult`` objects.
+    """
+    def __init__(self, message: str, results: list = None) -> None:
+        super().__init__(message)
+        self.results = results or []
+
+
+class KtutilUsageError(KtutilCommandError):
+    """
+    Raised when a ``ktutil`` command is unknown or has invalid arguments.
+    """
+    pass
+
+
+class KtutilKeytabError(KtutilCommandError):
+    """
+    Raised when ``ktutil`` fails to read or write a keytab file.
+    """
+    pass
+
+
+class KtutilEntryError(KtutilCommandError):
+    """
+    Raised when ``ktutil`` fails to add or delete a keylist entry.
+    """
+    pass
+
+
+class CcacheCollectionNotSupported(RuntimeError):
+    """
+    Raised when a Kerberos credential cache collection type isn't supported.
+    """
+    pass
+
+
+class CcacheNotDestroyed(RuntimeError):
+    """
+    Raised when one or more Kerberos credential caches cannot be destroyed.
+
+    :param message: error message.
+    :param principals: list of principals whose credential cache remains.
+    """
+    def __init__(self, message: str, principals: list = None) -> None:
+        super().__init__(message)
+        self.principals = principals or []
+
+
+class KeytabFileEmpty(RuntimeError):
+    """
+    Raised when a Kerberos keytab file has no entries.
+    """
+    pass
@@ -185,6 +185,25 @@ class Krb5:
         ):
             return False
 
+    def credentials(
+        self,
+        usage: str = "initiate"
+    ) -> t.Union[None, bool, gssapi.Credentials]:
+        """
+        Gets the Kerberos credentials from the credential store.
+
+        :param usage: usage of the credentials -- either 'both',
+            'initiate' or 'accept'.
+        :return: ``gssapi.Credentials`` object on success, None 
+            when the credential cache is expired, and False on 
+            errors.
+        """
+        return self._acquire_creds({
+            "name": self.principal,
+            "usage": usage,
+            "store": self.store
+        })
+
     def acquire_with_keytab(
         self,
         keytab: str,
@@ -0,0 +1,344 @@
+import typing as t
+import collections
+import hashlib
+import os
+import pathlib
+import shutil
+import subprocess
+import threading
+import time
+
+import gssapi
+
+from krb5ticket.errors import CcacheCollectionNotSupported, CcacheNotDestroyed
+from krb5ticket.krb5 import Krb5
+
+
+class Krb5Collection:
+    """
+    Kerberos V5 credential cache collection.
+
+    This class manages a ``DIR:`` or ``KEYRING:`` credential cache
+    collection holding the credentials of many principals. Each principal
+    is mapped to its own credential cache within the collection, whose
+    name is derived from the principal, so that the right cache is
+    selected without scanning the collection.
+
+    Caches of principals that haven't been used for ``idle_timeout``
+    seconds, or beyond ``max_principals``, are evicted from the collection.
+    There is no background eviction: it only happens when ``get`` (or any
+    method using it) or ``evict`` is called. Caches are destroyed outside
+    of the collection lock, so lookups of other principals never wait on
+    it, while a lookup of a principal being evicted waits until its cache
+    is destroyed. Caches that cannot be destroyed are kept aside, count
+    towards ``max_principals`` and are only retried by ``evict``. A
+    ``KEYRING:`` collection requires the ``kdestroy`` command.
+
+    :param collection: Kerberos credential cache collection, such as
+        ``DIR:/tmp/krb5cc_dir`` or ``KEYRING:persistent:1000``.
+    :param idle_timeout: seconds after which an unused principal's
+        credential cache is evicted.
+    :param max_principals: maximum number of principals kept in the
+        collection, evicting the least recently used first.
+    """
+    def __init__(
+        self,
+        collection: str,
+        idle_timeout: t.Optional[int] = None,
+        max_principals: t.Optional[int] = None
+    ) -> t.NoReturn:
+        if max_principals is not None and max_principals < 1:
+            raise ValueError("'max_principals' must be at least 1.")
+        self.collection = collection
+        self.idle_timeout = idle_timeout
+        self.max_principals = max_principals
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+        # Principals ordered from least to most recently used.
+        self._principals = collections.OrderedDict()
+        self._last_used = {}
+        # Principals whose credential cache is being destroyed.
+        self._evicting = set()
+        # Principals whose credential cache couldn't be destroyed.
+        self._undestroyed = collections.OrderedDict()
+
+    @property
+    def collection(self) -> str:
+        """
+        Gets the Kerberos credential cache collection.
+        """
+        return self._collection
+
+    @collection.setter
+    def collection(self, collection: str) -> None:
+        """
+        Sets the Kerberos credential cache collection.
+        """
+        cache_type, _, residual = collection.partition(":")
+        cache_type = cache_type.upper()
+        if cache_type not in ["DIR", "KEYRING"] or not residual:
+            raise CcacheCollectionNotSupported(
+                f"Kerberos credential cache collection '{collection}' "
+                "isn't supported, use either 'DIR:' or 'KEYRING:'.")
+        if cache_type == "DIR":
+            residual = residual.lstrip(":")
+            pathlib.Path(residual).mkdir(
+                mode=0o700, parents=True, exist_ok=True)
+        elif not shutil.which("kdestroy"):
+            raise CcacheCollectionNotSupported(
+                "Cannot find 'kdestroy' command, required to evict "
+                f"credential caches from '{collection}'.")
+        self._type = cache_type
+        self._residual = residual
+        self._collection = f"{cache_type}:{residual}"
+
+    @property
+    def principals(self) -> t.List[str]:
+        """
+        Gets the principals managed within the collection.
+        """
+        with self._lock:
+            return list(self._principals)
+
+    @property
+    def undestroyed(self) -> t.List[str]:
+        """
+        Gets the evicted principals whose credential cache couldn't be
+        destroyed, to be retried by ``evict``.
+        """
+        with self._lock:
+            return list(self._undestroyed)
+
+    def ccache(self, principal: str) -> str:
+        """
+        Gets the credential cache name of a principal within the collection.
+
+        :param principal: Kerberos principal.
+        :return: credential cache name.
+        """
+        digest = hashlib.sha256(principal.encode("UTF-8")).hexdigest()[:16]
+        if self._type == "DIR":
+            # Only files named "tkt*" belong to a DIR collection.
+            path = pathlib.Path(self._residual).joinpath(f"tkt{digest}")
+            return f"DIR::{path.as_posix()}"
+        return f"KEYRING:{self._residual}:krb5ticket_{digest}"
+
+    def get(self, principal: str) -> Krb5:
+        """
+        Gets the ``Krb5`` object bound to a principal's credential cache.
+
+        :param principal: Kerberos principal.
+        :return: ``Krb5`` object.
+        """
+        with self._changed:
+            # The credential cache is shared with a pending eviction, wait
+            # for it so that new credentials aren't destroyed.
+            while principal in self._evicting:
+                self._changed.wait()
+            krb = self._principals.get(principal)
+            if krb is None:
+                # A credential cache that couldn't be destroyed is reused.
+                self._undestroyed.pop(principal, None)
+                krb = Krb5(principal, self.ccache(principal))
+                self._principals[principal] = krb
+            else:
+                self._principals.move_to_end(principal)
+            self._last_used[principal] = time.monotonic()
+            evicted = self._pop_evicted()
+
+        # Caches that cannot be destroyed are reported by ``evict``.
+        self._destroy(evicted)
+        return krb
+
+    def acquire_with_keytab(
+        self,
+        principal: str,
+        keytab: str,
+        usage: str = "initiate",
+        set_default: bool = False,
+        overwrite: bool = True
+    ) -> bool:
+        """
+        Acquire Kerberos ticket-granting ticket (TGT) with keytab for a
+        principal within the collection.
+
+        :param principal: Kerberos principal.
+        :param keytab: Kerberos keytab file.
+        :param usage: usage to store the credentials with -- either 'both',
+            'initiate' or 'accept'.
+        :param set_default: whether or not to set these credentials as the
+            default for the given store.
+        :param overwrite: whether or not to overwrite existing credentials
+            stored with the same name.
+        :return: True on success, otherwise False.
+        """
+        return self.get(principal).acquire_with_keytab(
+            keytab, usage, set_default, overwrite)
+
+    def acquire_with_password(
+        self,
+        principal: str,
+        password: str,
+        usage: str = "initiate",
+        set_default: bool = False,
+        overwrite: bool = True
+    ) -> bool:
+        """
+        Acquire Kerberos ticket-granting ticket (TGT) with password for a
+        principal within the collection.
+
+        :param principal: Kerberos principal.
+        :param password: Kerberos credential password.
+        :param usage: usage to store the credentials with -- either
+            'both', 'initiate' or 'accept'.
+        :param set_default: whether or not to set these credentials
+            as the default for the given store.
+        :param overwrite: whether or not to overwrite existing
+            credentials stored with the same name.
+        :return: True on success, otherwise False.
+        """
+        return self.get(principal).acquire_with_password(
+            password, usage, set_default, overwrite)
+
+    def credentials(
+        self,
+        principal: str,
+        usage: str = "initiate"
+    ) -> t.Union[None, bool, gssapi.Credentials]:
+        """
+        Gets the Kerberos credentials of a principal from its credential
+        cache.
+
+        :param principal: Kerberos principal.
+        :param usage: usage of the credentials -- either 'both',
+            'initiate' or 'accept'.
+        :return: ``gssapi.Credentials`` object on success, None
+            when the credential cache is expired, and False on
+            errors.
+        """
+        return self.get(principal).credentials(usage)
+
+    def evict(self) -> t.List[str]:
+        """
+        Evicts idle principals and the least recently used principals
+        beyond ``max_principals`` from the collection, and retries the
+        destruction of credential caches that couldn't be destroyed.
+
+        :return: list of evicted principals.
+        :raises: ``CcacheNotDestroyed`` if one or more credential caches
+            cannot be destroyed. Their principals are kept in
+            ``undestroyed``.
+        """
+        with self._lock:
+            evicted = self._pop_evicted()
+            for principal in list(self._undestroyed):
+                del self._undestroyed[principal]
+                self._evicting.add(principal)
+                evicted.append(principal)
+        failed = self._destroy(evicted)
+        if failed:
+            raise CcacheNotDestroyed(
+                "Cannot destroy the credential cache of "
+                f"{', '.join(failed)}.", failed)
+        return evicted
+
+    def remove(self, principal: str) -> bool:
+        """
+        Removes a principal and destroys its credential cache.
+
+        :param principal: Kerberos principal.
+        :return: True if the principal was managed within the collection,
+            otherwise False.
+        :raises: ``CcacheNotDestroyed`` if the credential cache cannot be
+            destroyed. The principal is kept in ``undestroyed``.
+        """
+        with self._changed:
+            while principal in self._evicting:
+                self._changed.wait()
+            managed = self._principals.pop(principal, None) is not None
+            if principal in self._undestroyed:
+                del self._undestroyed[principal]
+                managed = True
+            if not managed:
+                return False
+            self._last_used.pop(principal, None)
+            self._evicting.add(principal)
+        if self._destroy([principal]):
+            raise CcacheNotDestroyed(
+                f"Cannot destroy the credential cache of {principal}.",
+                [principal])
+        return True
+
+    def _pop_evicted(self) -> t.List[str]:
+        """
+        Removes the principals to be evicted from the collection, and marks
+        them as being evicted. The collection lock must be held.
+
+        The most recently used principal is never evicted for exceeding
+        ``max_principals``, as it was just returned by ``get``.
+
+        :return: list of evicted principals.
+        """
+        evicted = []
+        now = time.monotonic()
+        while self._principals:
+            principal = next(iter(self._principals))
+            idle = self.idle_timeout is not None and \
+                now - self._last_used[principal] > self.idle_timeout
+            full = self.max_principals is not None and \
+                len(self._principals) > 1 and \
+                len(self._principals) + len(self._undestroyed) > \
+                self.max_principals
+            if not idle and not full:
+                break
+            del self._principals[principal]
+            del self._last_used[principal]
+            self._evicting.add(principal)
+            evicted.append(principal)
+        return evicted
+
+    def _destroy(self, principals: t.List[str]) -> t.List[str]:
+        """
+        Destroys the credential caches of principals being evicted, then
+        wakes up lookups waiting for them. Principals whose credential
+        cache cannot be destroyed are kept in ``undestroyed``.
+
+        :param principals: list of principals being evicted.
+        :return: list of principals whose credential cache remains.
+        """
+        if not principals:
+            return []
+        failed = [
+            principal for principal in principals
+            if not self._destroy_ccache(self.ccache(principal))]
+
+        with self._changed:
+            for principal in principals:
+                self._evicting.discard(principal)
+            for principal in failed:
+                self._undestroyed[principal] = None
+            self._changed.notify_all()
+        return failed
+
+    def _destroy_ccache(self, ccache: str) -> bool:
+        """
+        Destroys a credential cache.
+
+        :param ccache: credential cache name.
+        :return: True if the credential cache is destroyed, otherwise False.
+        """
+        try:
+            if self._type == "DIR":
+                path = ccache[len("DIR::"):]
+                if os.path.exists(path):
+                    os.remove(path)
+                return True
+            process = subprocess.run(
+                [shutil.which("kdestroy") or "kdestroy", "-c", ccache],
+                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                universal_newlines=True)
+        except OSError:
+            return False
+        # A cache that was never created is already gone.
+        return process.returncode == 0 or \
+            "No credentials cache found" in process.stderr
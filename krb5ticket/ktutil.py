@@ -5,7 +5,80 @@ import pandas
 import pathlib
 import subprocess
 
-from krb5ticket.errors import KtutilCommandNotFound
+from krb5ticket.errors import (
+    KtutilCommandNotFound,
+    KtutilCommandError,
+    KtutilUsageError,
+    KtutilKeytabError,
+    KtutilEntryError,
+)
+
+
+# Prompt written to STDOUT by ``ktutil`` each time it reads a request.
+_PROMPT = "ktutil:  "
+
+# Unknown request sent after every command. ``ktutil`` answers it with an
+# error on STDERR, which delimits the STDERR output of each command.
+_SYNC_MARKER = "__krb5ticket_sync_{}__"
+
+# Encryption type appended to each keylist entry by ``list -e``.
+_ENCTYPE = re.compile(r"\s+\(([^()\s]+)\)\s*$")
+
+# Error written to STDERR by ``ktutil`` for a request it doesn't know.
+_UNKNOWN_REQUEST = re.compile(r'Unknown request "(.*)"\.')
+
+_COMMAND_ERRORS = {
+    "read_kt": KtutilKeytabError,
+    "write_kt": KtutilKeytabError,
+    "addent": KtutilEntryError,
+    "delete_entry": KtutilEntryError,
+}
+
+
+class KtutilResult(t.NamedTuple):
+    """
+    Result of a single command issued within a ``ktutil`` session.
+
+    :param index: position of the command within the session.
+    :param command: command line sent to ``ktutil`` (passwords and keys
+        are never recorded).
+    :param stdout: STDOUT stream output of the command.
+    :param stderr: STDERR stream output of the command.
+    """
+    index: int
+    command: str
+    stdout: str
+    stderr: str
+
+    @property
+    def failed(self) -> bool:
+        """
+        Gets the command failure state.
+
+        :return: True if the command wrote to the STDERR stream, 
+            otherwise False.
+        """
+        return bool(self.stderr.strip())
+
+    @property
+    def exception(self) -> t.Optional[KtutilCommandError]:
+        """
+        Gets the typed exception matching the command failure.
+
+        :return: ``KtutilCommandError`` subclass instance if the command
+            failed, otherwise None.
+        """
+        if not self.failed:
+            return None
+        name = self.command.split(" ", 1)[0]
+        if "usage:" in self.stderr or "Unknown request" in self.stderr:
+            error = KtutilUsageError
+        else:
+            error = _COMMAND_ERRORS.get(name, KtutilCommandError)
+        message = self.stderr.strip().splitlines()[0]
+        return error(
+            f"Command #{self.index} '{self.command}' failed: {message}",
+            [self])
 
 
 class ktutil:
@@ -23,7 +96,7 @@ class ktutil:
         """
         Close ``subprocess`` object.
         """
-        if self._cursor:
+        if getattr(self, "_cursor", None):
             self._cursor.terminate()
             self._cursor.wait(timeout=30)
 
@@ -37,14 +110,33 @@ class ktutil:
         return self._error_msg
 
     @error.setter
-    def error(self, stderr: io.TextIOWrapper) -> None:
+    def error(self, stderr: str) -> None:
         """
         Sets STDERR stream output.
         
-        :param stdout: ``io.TextIOWrapper`` object of the STDERR stream.
+        :param stderr: STDERR stream output of the failed command.
         :return: None
         """
-        self._error_msg = stderr.readline().strip()
+        lines = stderr.strip().splitlines()
+        self._error_msg = lines[0] if lines else ""
+
+    @property
+    def results(self) -> t.List[KtutilResult]:
+        """
+        Gets the per-command results of the last ``ktutil`` session.
+
+        :return: list of ``KtutilResult`` objects, in command order.
+        """
+        return getattr(self, "_results", [])
+
+    @property
+    def failures(self) -> t.List[KtutilResult]:
+        """
+        Gets the failed commands of the last ``ktutil`` session.
+
+        :return: list of failed ``KtutilResult`` objects.
+        """
+        return [result for result in self.results if result.failed]
 
     @property
     def keylist(self) -> dict:
@@ -56,20 +148,27 @@ class ktutil:
         return self._keylist if hasattr(self, "_keylist") else None
 
     @keylist.setter
-    def keylist(self, stdout: io.TextIOWrapper) -> t.List[dict]:
+    def keylist(self, stdout: str) -> t.List[dict]:
         """
         Sets the current keylist of the loaded Kerberos keytab file.
         
-        :param stdout: ``io.TextIOWrapper`` object of the STDOUT stream.
+        :param stdout: STDOUT stream output of the ``list`` command.
         :return: None
         """
         self._keylist = []
         raw_keys = []
-        for line in stdout.readlines():
+        enctypes = False
+        for line in stdout.splitlines():
             if (not re.findall(".*ktutil:.*", line) and 
                 not line.startswith("-")):
+                if _ENCTYPE.search(line):
+                    line = _ENCTYPE.sub(r" \1", line)
+                    enctypes = True
                 raw_keys.append(line)
 
+        if enctypes:
+            raw_keys[0] = f"{raw_keys[0].rstrip()} Enctype"
+
         if len(raw_keys) != 0:
             keystrings = io.StringIO("\n".join(raw_keys))
             data = pandas.read_csv(
@@ -138,20 +237,37 @@ class ktutil:
         """
         Instantiates the ``ktutil`` command-line interface.
         """
+        self._commands = []
+        self._results = []
         self._cursor = subprocess.Popen(
             ktutil.resolve_command("ktutil"), stdin=subprocess.PIPE, 
             stdout=subprocess.PIPE, stderr=subprocess.PIPE, 
             universal_newlines=True, close_fds=True)
 
-    def list(self) -> "ktutil":
+    def _send(self, command: str, *lines: str) -> "ktutil":
+        """
+        Queues a command for the current ``ktutil`` session.
+
+        Commands are sent when the session is closed with ``quit``, so
+        that the output of every command can be tracked separately.
+
+        :param command: command line.
+        :param lines: additional input lines read by the command, which
+            are not recorded in the command results.
+        :return: ``ktutil`` object.
+        """
+        self._commands.append((command, lines))
+        return self
+
+    def list(self, enctypes: t.Optional[bool] = False) -> "ktutil":
         """
         Displays the current keylist.
         
+        :param enctypes: whether or not to display the encryption type of
+            each entry.
         :return: ``ktutil`` object.
         """
-        self._cursor.stdin.write("list\n")
-        self._cursor.stdin.flush()
-        return self
+        return self._send("list -e" if enctypes else "list")
 
     def read_kt(self, keytab_file: str) -> "ktutil":
         """
@@ -162,9 +278,7 @@ class ktutil:
         :return: ``ktutil`` object.
         """
         keytab_file = ktutil.resolve_keytab_file(keytab_file)
-        self._cursor.stdin.write(f"read_kt {keytab_file}\n")
-        self._cursor.stdin.flush()
-        return self
+        return self._send(f"read_kt {keytab_file}")
 
     def write_kt(self, keytab_file: str) -> "ktutil":
         """
@@ -174,9 +288,7 @@ class ktutil:
         :return: ``ktutil`` object.
         """
         keytab_file = ktutil.resolve_keytab_file(keytab_file)
-        self._cursor.stdin.write(f"write_kt {keytab_file}\n")
-        self._cursor.stdin.flush()
-        return self
+        return self._send(f"write_kt {keytab_file}")
 
     def delete_entry(self, slot: int) -> "ktutil":
         """
@@ -185,9 +297,7 @@ class ktutil:
         :param slot: keylist slot number.
         :return: ``ktutil`` object.
         """
-        self._cursor.stdin.write(f"delete_entry {slot}\n")
-        self._cursor.stdin.flush()
-        return self
+        return self._send(f"delete_entry {slot}")
 
     def add_entry(
         self,
@@ -208,25 +318,110 @@ class ktutil:
         :return: ``ktutil`` object.
         """
         type = ktutil.validate_entry_type(type)
-        self._cursor.stdin.write(
-            f"addent -{type} -p {principal} -k {kvno} -e {enctype}\n")
-        self._cursor.stdin.write(f"{password_or_key}\n")
-        self._cursor.stdin.flush()
-        return self
+        return self._send(
+            f"addent -{type} -p {principal} -k {kvno} -e {enctype}",
+            password_or_key)
 
     def quit(self) -> None:
         """
         Quits ktutil.
 
+        All queued commands are sent to ``ktutil``, followed by a
+        synchronization marker, so that the STDOUT and STDERR output of
+        each command is captured separately in ``results``.
+
         :return: None
         """
-        self._cursor.stdin.write("quit\n")
-        self._cursor.stdin.flush()
-        self.keylist = self._cursor.stdout
-        self.returncode = self._cursor.poll()
-        self.error = self._cursor.stderr
+        payload = []
+        for index, (command, lines) in enumerate(self._commands):
+            payload.append(command)
+            payload.extend(lines)
+            payload.append(_SYNC_MARKER.format(index))
+        payload.append("quit")
 
-        # Close pipes
-        self._cursor.stdin.close()
-        self._cursor.stdout.close()
-        self._cursor.stderr.close()
\ No newline at end of file
+        stdout, stderr = self._cursor.communicate("\n".join(payload) + "\n")
+        self.returncode = self._cursor.returncode
+        self._results = self._parse_results(stdout, stderr)
+        self._commands = []
+
+        listings = [
+            result for result in self._results
+            if result.command.split(" ", 1)[0] == "list"]
+        if listings:
+            # Without prompts the output cannot be split per command, so
+            # fall back to parsing the whole session output.
+            self.keylist = listings[-1].stdout \
+                if _PROMPT in stdout else stdout
+        self.error = self.failures[-1].stderr if self.failures else ""
+
+    def _parse_results(
+        self,
+        stdout: str,
+        stderr: str
+    ) -> t.List[KtutilResult]:
+        """
+        Splits the session output into per-command results.
+
+        ``ktutil`` writes a prompt to the STDOUT stream for every request
+        it reads, and each synchronization marker writes exactly one line
+        to the STDERR stream.
+
+        When ``addent`` rejects its arguments, it doesn't read the password
+        or key, which ``ktutil`` then reads as an unknown request. Such
+        requests are counted to keep the STDOUT stream aligned, and their
+        errors are removed from the results.
+
+        :param stdout: STDOUT stream output of the session.
+        :param stderr: STDERR stream output of the session.
+        :return: list of ``KtutilResult`` objects.
+        """
+        secrets = {
+            line for _, lines in self._commands for line in lines if line}
+
+        errors = [[] for _ in self._commands]
+        leaked = [0 for _ in self._commands]
+        index = 0
+        for line in stderr.splitlines():
+            if index >= len(errors):
+                break
+            request = _UNKNOWN_REQUEST.search(line)
+            if _SYNC_MARKER.format(index) in line:
+                index += 1
+            elif request and request.group(1) in secrets:
+                leaked[index] += 1
+            else:
+                errors[index].append(line)
+
+        # Every command is followed by its marker, plus one request for
+        # each password or key that wasn't read by the command, whose
+        # output is skipped.
+        segments = stdout.split(_PROMPT)
+        position = 1
+
+        results = []
+        for index, (command, _) in enumerate(self._commands):
+            output = segments[position] if position < len(segments) else ""
+            position += 2 + leaked[index]
+            if leaked[index] and not errors[index]:
+                errors[index].append(
+                    f"{command.split(' ', 1)[0]}: password or key not read")
+            results.append(KtutilResult(
+                index=index,
+                command=command,
+                stdout=output,
+                stderr="\n".join(errors[index])))
+        return results
+
+    def raise_for_errors(self) -> None:
+        """
+        Raises an exception if any command of the last session failed.
+
+        :return: None
+        :raises: ``KtutilCommandError`` (or the typed subclass of the first
+            failure) holding every failed ``KtutilResult`` in ``results``.
+        """
+        failures = self.failures
+        if failures:
+            error = failures[0].exception
+            error.results = failures
+            raise error
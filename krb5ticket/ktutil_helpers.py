@@ -1,4 +1,5 @@
 import typing as t
+import os
 import shutil
 
 from krb5ticket import ktutil
@@ -10,9 +11,14 @@ def create_entries(
     password_or_passphrase: str,
     enctypes: t.List[str],
     kvno: t.Optional[int] = 1,
-    entry_type: t.Optional[str] = "password"):
+    entry_type: t.Optional[str] = "password",
+    raise_on_error: t.Optional[bool] = False) -> bool:
     """
     Creates one or more entries and write keylist to a Kerberos keytab.
+
+    Every ``addent`` and ``write_kt`` command is tracked separately. With
+    ``raise_on_error``, the raised exception holds the failed commands in
+    its ``results`` attribute, so that only those can be retried.
     
     :param principal: Kerberos principal.
     :param keytab_file: Kerberos V5 keytab file name. The file can be a 
@@ -21,6 +27,10 @@ def create_entries(
     :param enctypes: list of encryption types to add.
     :param kvno: key version number.
     :param entry_type: keylist entry type -- either "password" or "key".
+    :param raise_on_error: whether or not to raise on failed commands.
+    :return: True on success, otherwise False.
+    :raises: ``KtutilCommandError`` if ``raise_on_error`` is set and one
+        or more commands failed.
     """
     keytab_file = ktutil.resolve_keytab_file(keytab_file)
     kt = ktutil()
@@ -30,7 +40,9 @@ def create_entries(
     kt.write_kt(keytab_file)
     kt.quit()
 
-    return True if kt.error else False
+    if raise_on_error:
+        kt.raise_for_errors()
+    return not kt.failures
 
 
 def list_entries(keytab_file: str) -> t.Union[t.List[dict], bool]:
@@ -52,7 +64,10 @@ def list_entries(keytab_file: str) -> t.Union[t.List[dict], bool]:
     return False
 
 
-def delete_entries(keytab_file: str, slots: t.List[int]) -> bool:
+def delete_entries(
+    keytab_file: str,
+    slots: t.List[int],
+    raise_on_error: t.Optional[bool] = False) -> bool:
     """
     Deletes one or more entries from a Kerberos keytab.
     
@@ -66,7 +81,10 @@ def delete_entries(keytab_file: str, slots: t.List[int]) -> bool:
     :param keytab_file: Kerberos V5 keytab file name. The file can be a 
         relative path read from the user's home directory.
     :param slots: list of slots to be deleted from the keylist.
+    :param raise_on_error: whether or not to raise on failed commands.
     :return: True on success, otherwise False.
+    :raises: ``KtutilCommandError`` if ``raise_on_error`` is set and one
+        or more commands failed.
     """
     keytab_file = ktutil.keytab_exists(keytab_file)
     if not keytab_file or not isinstance(slots, list):
@@ -81,6 +99,8 @@ def delete_entries(keytab_file: str, slots: t.List[int]) -> bool:
     kt.read_kt(keytab_file)
     kt.list()
     kt.quit()
+    if raise_on_error:
+        kt.raise_for_errors()
     existing_slots = [
         key["slot"] for key in kt.keylist if key["slot"] in slots]
 
@@ -99,6 +119,14 @@ def delete_entries(keytab_file: str, slots: t.List[int]) -> bool:
     kt.write_kt(keytab_tmp)
     kt.quit()
 
+    if kt.failures:
+        # Leave the original keytab untouched if any command failed.
+        if os.path.exists(keytab_tmp):
+            os.remove(keytab_tmp)
+        if raise_on_error:
+            kt.raise_for_errors()
+        return False
+
     shutil.move(keytab_tmp, keytab_file)
 
-    return True if kt.error else False
+    return True
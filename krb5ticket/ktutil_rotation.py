@@ -0,0 +1,432 @@
+import typing as t
+import os
+import json
+import stat
+import shutil
+import tempfile
+import concurrent.futures
+
+from krb5ticket.errors import KeytabFileNotExists, KeytabFileEmpty
+from krb5ticket.ktutil import ktutil
+
+
+class RotationResult(t.NamedTuple):
+    """
+    Result of the rotation of a single Kerberos keytab file.
+
+    :param keytab_file: resolved Kerberos V5 keytab file.
+    :param status: rotation status -- either "rotated", "planned",
+        "skipped" or "failed".
+    :param kvnos: new key version number for each principal, if known.
+    :param added: number of entries added (or to be added).
+    :param pruned: keylist slots deleted (or to be deleted), if known.
+    :param error: exception raised during the rotation, if any.
+    """
+    keytab_file: str
+    status: str
+    kvnos: t.Optional[t.Dict[str, int]] = None
+    added: int = 0
+    pruned: t.Optional[t.List[int]] = None
+    error: t.Optional[Exception] = None
+
+
+class _Plan(t.NamedTuple):
+    """
+    Planned rotation of a single Kerberos keytab file.
+    """
+    keytab_file: str
+    kvnos: t.Dict[str, int]
+    pending: t.Dict[str, int]
+    enctypes: t.Dict[str, t.List[str]]
+    pruned: t.List[int]
+
+    @property
+    def added(self) -> int:
+        return sum(len(self.enctypes[principal]) for principal in self.pending)
+
+    def result(self, status: str, error: Exception = None) -> RotationResult:
+        return RotationResult(
+            self.keytab_file, status, self.kvnos, self.added, self.pruned,
+            error)
+
+
+class RotationReport:
+    """
+    Report of a keytab rotation.
+
+    :param results: list of ``RotationResult`` objects.
+    """
+    def __init__(self, results: t.List[RotationResult]) -> t.NoReturn:
+        self.results = results
+
+    def _with_status(self, status: str) -> t.List[RotationResult]:
+        return [result for result in self.results if result.status == status]
+
+    @property
+    def rotated(self) -> t.List[RotationResult]:
+        """
+        Gets the keytab files that were rotated.
+        """
+        return self._with_status("rotated")
+
+    @property
+    def planned(self) -> t.List[RotationResult]:
+        """
+        Gets the keytab files that would be rotated (dry run).
+        """
+        return self._with_status("planned")
+
+    @property
+    def skipped(self) -> t.List[RotationResult]:
+        """
+        Gets the keytab files that were already rotated.
+        """
+        return self._with_status("skipped")
+
+    @property
+    def failed(self) -> t.List[RotationResult]:
+        """
+        Gets the keytab files that failed to rotate.
+        """
+        return self._with_status("failed")
+
+    @property
+    def failed_keytabs(self) -> t.List[str]:
+        """
+        Gets the keytab files that failed to rotate, to be rotated again.
+        """
+        return [result.keytab_file for result in self.failed]
+
+    @property
+    def kvnos(self) -> t.Dict[str, int]:
+        """
+        Gets the new key version number of each principal.
+
+        Passing it to ``rotate`` makes a re-run rotate principals to the
+        same key version numbers, instead of bumping them again.
+
+        :return: dictionary of principals and key version numbers.
+        """
+        kvnos = {}
+        for result in self.results:
+            for principal, version in (result.kvnos or {}).items():
+                kvnos[principal] = max(kvnos.get(principal, 0), version)
+        return kvnos
+
+    @property
+    def ok(self) -> bool:
+        """
+        Gets the rotation success state.
+
+        :return: True if no keytab file failed to rotate, otherwise False.
+        """
+        return not self.failed
+
+
+def _read_keylist(keytab_file: str) -> t.List[dict]:
+    """
+    Reads the current keylist of a Kerberos keytab file, with the
+    encryption type of each entry.
+
+    :param keytab_file: resolved Kerberos V5 keytab file.
+    :return: list of dictionary items containing the keylist information.
+    :raises: ``KtutilCommandError`` if the keytab file cannot be read.
+    """
+    kt = ktutil()
+    kt.read_kt(keytab_file)
+    kt.list(enctypes=True)
+    kt.quit()
+    kt.raise_for_errors()
+    return kt.keylist or []
+
+
+def _load_state(state_file: str) -> t.Dict[str, t.Dict[str, int]]:
+    """
+    Loads the key version numbers targeted by a previous rotation.
+
+    :param state_file: rotation state file.
+    :return: dictionary of keytab files and the key version number of
+        each of their principals.
+    """
+    if not os.path.exists(state_file):
+        return {}
+    with open(state_file) as handle:
+        return json.load(handle).get("kvnos", {})
+
+
+def _save_state(
+    state_file: str,
+    targets: t.Dict[str, t.Dict[str, int]]
+) -> None:
+    """
+    Saves the key version numbers targeted by a rotation, atomically.
+
+    :param state_file: rotation state file.
+    :param targets: dictionary of keytab files and the key version number
+        of each of their principals.
+    """
+    directory = os.path.dirname(state_file) or "."
+    fd, state_tmp = tempfile.mkstemp(prefix=".krb5ticket-", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as handle:
+            json.dump({"kvnos": targets}, handle, indent=2, sort_keys=True)
+        os.replace(state_tmp, state_file)
+    finally:
+        if os.path.exists(state_tmp):
+            os.remove(state_tmp)
+
+
+def _plan_keytab(
+    keytab_file: str,
+    password_or_key: t.Union[str, t.Dict[str, str]],
+    enctypes: t.Optional[t.List[str]],
+    keep_versions: int,
+    kvnos: t.Dict[str, int],
+    entry_type: str
+) -> t.Union[_Plan, RotationResult]:
+    """
+    Plans the rotation of a single Kerberos keytab file.
+
+    The current keylist is read once to find the key version number and
+    encryption types of each principal.
+
+    :return: ``_Plan`` object, otherwise ``RotationResult`` object if the
+        keytab file is already rotated or cannot be rotated.
+    """
+    if not ktutil.keytab_exists(keytab_file):
+        return RotationResult(
+            keytab_file, "failed",
+            error=KeytabFileNotExists(
+                f"Kerberos keytab file '{keytab_file}' doesn't exist."))
+
+    keylist = _read_keylist(keytab_file)
+    if not keylist:
+        return RotationResult(
+            keytab_file, "failed",
+            error=KeytabFileEmpty(
+                f"Kerberos keytab file '{keytab_file}' has no entries."))
+
+    current = {}
+    for key in keylist:
+        principal = key["principal"]
+        current[principal] = max(current.get(principal, 0), int(key["kvno"]))
+
+    # Without explicit encryption types, keep those of the current key
+    # version of each principal.
+    current_enctypes = {principal: [] for principal in current}
+    for key in keylist:
+        principal = key["principal"]
+        enctype = key.get("enctype")
+        if int(key["kvno"]) == current[principal] and \
+                isinstance(enctype, str) and \
+                enctype not in current_enctypes[principal]:
+            current_enctypes[principal].append(enctype)
+
+    targets = {
+        principal: kvnos.get(principal, version + 1)
+        for principal, version in current.items()}
+
+    # Principals that already reached their target key version number are
+    # not rotated again, so re-runs only touch what's left.
+    pending = {
+        principal: version for principal, version in targets.items()
+        if current[principal] < version}
+    if not pending:
+        return RotationResult(keytab_file, "skipped", targets, 0, [])
+
+    plan_enctypes = {
+        principal: list(enctypes) if enctypes else current_enctypes[principal]
+        for principal in pending}
+    for principal, principal_enctypes in plan_enctypes.items():
+        if not principal_enctypes:
+            raise ValueError(
+                f"No encryption types found for '{principal}'.")
+        if isinstance(password_or_key, dict):
+            missing = set(principal_enctypes) - set(password_or_key)
+            if missing:
+                raise ValueError(
+                    "No key given for encryption types "
+                    f"{', '.join(sorted(missing))}.")
+        elif ktutil.validate_entry_type(entry_type) == "key" and \
+                len(principal_enctypes) > 1:
+            raise ValueError(
+                "A single key cannot be used for several encryption types, "
+                "pass a key for each encryption type.")
+
+    # Delete slots in descending order, as ``ktutil`` renumbers the slots
+    # following a deleted entry.
+    pruned = sorted(
+        (int(key["slot"]) for key in keylist
+         if key["principal"] in pending and
+         int(key["kvno"]) <= pending[key["principal"]] - keep_versions),
+        reverse=True)
+
+    return _Plan(keytab_file, targets, pending, plan_enctypes, pruned)
+
+
+def _apply_plan(
+    plan: _Plan,
+    password_or_key: t.Union[str, t.Dict[str, str]],
+    entry_type: str
+) -> RotationResult:
+    """
+    Applies the planned rotation of a single Kerberos keytab file.
+
+    New entries are added, old entries pruned and the keylist written to
+    a temporary file within a single ``ktutil`` session. The temporary
+    file replaces the original keytab file, with its mode and owner, only
+    if every command succeeded.
+
+    :return: ``RotationResult`` object.
+    """
+    # A unique directory next to the keytab file keeps concurrent
+    # rotations apart, and allows an atomic rename onto the keytab file.
+    temp_dir = tempfile.mkdtemp(
+        prefix=".krb5ticket-", dir=os.path.dirname(plan.keytab_file))
+    keytab_tmp = os.path.join(temp_dir, os.path.basename(plan.keytab_file))
+    try:
+        kt = ktutil()
+        kt.read_kt(plan.keytab_file)
+        for slot in plan.pruned:
+            kt.delete_entry(slot)
+        for principal, version in plan.pending.items():
+            for enctype in plan.enctypes[principal]:
+                secret = password_or_key[enctype] \
+                    if isinstance(password_or_key, dict) else password_or_key
+                kt.add_entry(principal, secret, version, enctype, entry_type)
+        kt.write_kt(keytab_tmp)
+        kt.quit()
+        kt.raise_for_errors()
+
+        # ``ktutil`` creates the keytab file with its own mode and owner,
+        # keep the original ones so services can still read it.
+        original = os.stat(plan.keytab_file)
+        os.chmod(keytab_tmp, stat.S_IMODE(original.st_mode))
+        written = os.stat(keytab_tmp)
+        if (written.st_uid, written.st_gid) != \
+                (original.st_uid, original.st_gid):
+            os.chown(keytab_tmp, original.st_uid, original.st_gid)
+
+        os.replace(keytab_tmp, plan.keytab_file)
+    except Exception as error:
+        return plan.result("failed", error)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    return plan.result("rotated")
+
+
+def _safely(keytab_file: str, function: t.Callable, *args) -> t.Any:
+    """
+    Runs a rotation step for a single Kerberos keytab file, reporting any
+    error as a failed rotation so that it doesn't abort the other keytab
+    files.
+
+    :param keytab_file: resolved Kerberos V5 keytab file.
+    :param function: rotation step.
+    :return: result of the rotation step, otherwise a failed
+        ``RotationResult`` object.
+    """
+    try:
+        return function(*args)
+    except Exception as error:
+        return RotationResult(keytab_file, "failed", error=error)
+
+
+def rotate(
+    keytabs: t.List[str],
+    new_password_or_key: t.Union[str, t.Dict[str, str]],
+    keep_versions: t.Optional[int] = 2,
+    workers: t.Optional[int] = None,
+    enctypes: t.Optional[t.List[str]] = None,
+    kvnos: t.Optional[t.Dict[str, int]] = None,
+    state_file: t.Optional[str] = None,
+    entry_type: t.Optional[str] = "password",
+    dry_run: t.Optional[bool] = False
+) -> RotationReport:
+    """
+    Rotates the keys of one or more Kerberos keytab files.
+
+    For each keytab file, entries are added at the next key version number
+    of every principal for each encryption type, and key versions older
+    than ``keep_versions`` are pruned. Each keytab file is rewritten
+    atomically, so that it is either fully rotated or left untouched.
+    Keytab files are rotated in parallel, and an error in one keytab file
+    is reported in its ``RotationResult`` without affecting the others.
+
+    With a ``state_file``, the key version numbers targeted for each
+    keytab file are saved before any keytab file is rewritten, and are
+    reused by the next call with the same ``state_file``. Re-running the
+    same rotation after a partial failure or a crash therefore only
+    rotates the keytab files that weren't rotated yet. The state file is
+    removed once every keytab file of the call is rotated::
+
+        report = rotate(KEYTABS, PASSWORD, state_file="rotation.json")
+        if not report.ok:
+            report = rotate(KEYTABS, PASSWORD, state_file="rotation.json")
+
+    Without a ``state_file``, every call rotates to the next key version
+    number, unless the key version numbers of a previous report are
+    passed with ``kvnos=report.kvnos``.
+
+    :param keytabs: list of Kerberos V5 keytab file names. The files can
+        be relative paths read from the user's home directory. Repeated
+        keytab files are rotated once.
+    :param new_password_or_key: new password or key, or a dictionary of
+        encryption types and keys. A single key cannot be used for several
+        encryption types.
+    :param keep_versions: number of key versions to keep, including the
+        new one.
+    :param workers: maximum number of keytab files rotated in parallel.
+    :param enctypes: list of encryption types to add, otherwise those of
+        the current key version of each principal.
+    :param kvnos: new key version number of each principal. Principals
+        not listed get their current key version number plus one.
+    :param state_file: rotation state file. The file can be a relative
+        path read from the user's home directory.
+    :param entry_type: keylist entry type -- either "password" or "key".
+    :param dry_run: whether or not to only report the planned changes.
+    :return: ``RotationReport`` object, in the order of ``keytabs``.
+    """
+    keep_versions = max(int(keep_versions), 1)
+    kvnos = dict(kvnos or {})
+    if state_file:
+        state_file = ktutil.resolve_keytab_file(state_file)
+    state = _load_state(state_file) if state_file else {}
+
+    # Rotating the same keytab file twice would race on its keylist.
+    unique = {}
+    for keytab_file in keytabs:
+        resolved = ktutil.resolve_keytab_file(keytab_file)
+        unique.setdefault(os.path.realpath(resolved), resolved)
+    keytab_files = list(unique.values())
+
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        plans = list(executor.map(
+            lambda keytab_file: _safely(
+                keytab_file, _plan_keytab, keytab_file, new_password_or_key,
+                enctypes, keep_versions,
+                {**state.get(keytab_file, {}), **kvnos}, entry_type),
+            keytab_files))
+
+        if dry_run:
+            return RotationReport([
+                plan.result("planned") if isinstance(plan, _Plan) else plan
+                for plan in plans])
+
+        if state_file:
+            for plan in plans:
+                if plan.kvnos:
+                    state[plan.keytab_file] = plan.kvnos
+            _save_state(state_file, state)
+
+        results = list(executor.map(
+            lambda plan: _safely(
+                plan.keytab_file, _apply_plan, plan, new_password_or_key,
+                entry_type) if isinstance(plan, _Plan) else plan,
+            plans))
+
+    report = RotationReport(results)
+    if state_file and report.ok and os.path.exists(state_file):
+        os.remove(state_file)
+    return report
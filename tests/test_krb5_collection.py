@@ -0,0 +1,170 @@
+import os
+import threading
+
+import pytest
+
+from krb5ticket import Krb5Collection, CcacheNotDestroyed
+from krb5ticket import krb5_collection
+
+
+class Clock:
+    """
+    Monotonic clock moved forward by the tests.
+    """
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(krb5_collection.time, "monotonic", clock)
+    return clock
+
+
+def cache_file(collection: Krb5Collection, principal: str) -> str:
+    """
+    Creates the credential cache file of a principal.
+    """
+    path = collection.ccache(principal)[len("DIR::"):]
+    open(path, "w").close()
+    return path
+
+
+def test_ccache(tmp_path):
+    collection = Krb5Collection(f"DIR:{tmp_path}")
+
+    ccache = collection.ccache("a@EXAMPLE.COM")
+    assert ccache.startswith(f"DIR::{tmp_path}/tkt")
+    assert ccache == collection.ccache("a@EXAMPLE.COM")
+    assert ccache != collection.ccache("b@EXAMPLE.COM")
+    assert collection.get("a@EXAMPLE.COM") is \
+        collection.get("a@EXAMPLE.COM")
+
+
+def test_max_principals(tmp_path, clock):
+    collection = Krb5Collection(f"DIR:{tmp_path}", max_principals=2)
+    path = cache_file(collection, "b@EXAMPLE.COM")
+
+    for principal in ["a", "b", "a", "c"]:
+        collection.get(f"{principal}@EXAMPLE.COM")
+
+    assert collection.principals == ["a@EXAMPLE.COM", "c@EXAMPLE.COM"]
+    assert not os.path.exists(path)
+
+
+def test_invalid_max_principals(tmp_path):
+    with pytest.raises(ValueError):
+        Krb5Collection(f"DIR:{tmp_path}", max_principals=0)
+
+
+def test_idle_timeout(tmp_path, clock):
+    collection = Krb5Collection(f"DIR:{tmp_path}", idle_timeout=10)
+    path = cache_file(collection, "a@EXAMPLE.COM")
+    collection.get("a@EXAMPLE.COM")
+    clock.now = 5
+    collection.get("b@EXAMPLE.COM")
+
+    clock.now = 12
+    assert collection.evict() == ["a@EXAMPLE.COM"]
+    assert collection.principals == ["b@EXAMPLE.COM"]
+    assert not os.path.exists(path)
+
+
+def test_remove(tmp_path):
+    collection = Krb5Collection(f"DIR:{tmp_path}")
+    path = cache_file(collection, "a@EXAMPLE.COM")
+    collection.get("a@EXAMPLE.COM")
+
+    assert collection.remove("a@EXAMPLE.COM")
+    assert not os.path.exists(path)
+    assert collection.principals == []
+    assert not collection.remove("a@EXAMPLE.COM")
+
+
+def test_undestroyed(tmp_path, clock, monkeypatch):
+    collection = Krb5Collection(f"DIR:{tmp_path}", max_principals=1)
+    destroyed = []
+    succeed = False
+
+    def destroy(ccache):
+        destroyed.append(ccache)
+        return succeed
+
+    monkeypatch.setattr(collection, "_destroy_ccache", destroy)
+    collection.get("a@EXAMPLE.COM")
+    collection.get("b@EXAMPLE.COM")
+    assert collection.principals == ["b@EXAMPLE.COM"]
+    assert collection.undestroyed == ["a@EXAMPLE.COM"]
+
+    # Lookups don't retry the destruction.
+    for _ in range(5):
+        collection.get("b@EXAMPLE.COM")
+    assert len(destroyed) == 1
+
+    # Caches that couldn't be destroyed count towards the capacity.
+    collection.get("c@EXAMPLE.COM")
+    assert collection.principals == ["c@EXAMPLE.COM"]
+    assert collection.undestroyed == ["a@EXAMPLE.COM", "b@EXAMPLE.COM"]
+
+    with pytest.raises(CcacheNotDestroyed) as error:
+        collection.evict()
+    assert error.value.principals == ["a@EXAMPLE.COM", "b@EXAMPLE.COM"]
+
+    succeed = True
+    assert collection.evict() == ["a@EXAMPLE.COM", "b@EXAMPLE.COM"]
+    assert collection.undestroyed == []
+
+
+def test_undestroyed_reused(tmp_path, monkeypatch):
+    collection = Krb5Collection(f"DIR:{tmp_path}", max_principals=1)
+    monkeypatch.setattr(collection, "_destroy_ccache", lambda ccache: False)
+    collection.get("a@EXAMPLE.COM")
+    collection.get("b@EXAMPLE.COM")
+
+    collection.get("a@EXAMPLE.COM")
+    assert "a@EXAMPLE.COM" in collection.principals
+    assert "a@EXAMPLE.COM" not in collection.undestroyed
+
+    with pytest.raises(CcacheNotDestroyed):
+        collection.remove("a@EXAMPLE.COM")
+    assert "a@EXAMPLE.COM" in collection.undestroyed
+
+
+def test_get_waits_for_eviction(tmp_path, monkeypatch):
+    collection = Krb5Collection(f"DIR:{tmp_path}", max_principals=1)
+    collection.get("a@EXAMPLE.COM")
+    events = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def destroy(ccache):
+        started.set()
+        release.wait(5)
+        events.append("destroyed")
+        return True
+
+    monkeypatch.setattr(collection, "_destroy_ccache", destroy)
+    evicting = threading.Thread(
+        target=collection.get, args=("b@EXAMPLE.COM",))
+    evicting.start()
+    assert started.wait(5)
+
+    def lookup():
+        collection.get("a@EXAMPLE.COM")
+        events.append("found")
+
+    looking_up = threading.Thread(target=lookup)
+    looking_up.start()
+    looking_up.join(0.2)
+    assert looking_up.is_alive()
+
+    release.set()
+    evicting.join(5)
+    looking_up.join(5)
+    # The lookup of "a" evicts "b" in turn, after "a" was destroyed.
+    assert events == ["destroyed", "destroyed", "found"]
+    assert collection.principals == ["a@EXAMPLE.COM"]
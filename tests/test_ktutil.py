@@ -0,0 +1,182 @@
+from unittest import mock
+
+import pytest
+
+from krb5ticket import ktutil, KtutilKeytabError, KtutilEntryError
+from krb5ticket.ktutil import _PROMPT, _SYNC_MARKER
+
+
+SECRET = "s3cr3t-passw0rd"
+
+
+def unknown(request: str) -> str:
+    return f'ktutil: Unknown request "{request}".  Type "?" for a request list.'
+
+
+def session() -> ktutil:
+    """
+    Returns a ``ktutil`` object without spawning the ``ktutil`` process.
+    """
+    kt = ktutil.__new__(ktutil)
+    kt._cursor = None
+    kt._commands = []
+    kt._results = []
+    return kt
+
+
+def run(kt: ktutil, stdout: str, stderr: str) -> ktutil:
+    kt._cursor = mock.Mock()
+    kt._cursor.communicate.return_value = (stdout, stderr)
+    kt._cursor.returncode = 0
+    kt.quit()
+    return kt
+
+
+LISTING = (
+    "slot KVNO Principal\n"
+    "---- ---- ---------------------------------------------------------\n"
+    "   1    1                                 jsmith@EXAMPLE.COM\n")
+
+
+def test_success():
+    kt = session().read_kt("/tmp/jsmith.keytab").list().write_kt("/tmp/out")
+    stdout = _PROMPT * 3 + LISTING + _PROMPT * 5
+    stderr = "\n".join(unknown(_SYNC_MARKER.format(i)) for i in range(3))
+    run(kt, stdout, stderr)
+
+    assert [result.command for result in kt.results] == [
+        "read_kt /tmp/jsmith.keytab", "list", "write_kt /tmp/out"]
+    assert kt.failures == []
+    assert kt.error == ""
+    assert kt.results[1].stdout.startswith("slot KVNO Principal")
+    assert kt.keylist == [
+        {"slot": 1, "kvno": 1, "principal": "jsmith@EXAMPLE.COM"}]
+    kt.raise_for_errors()
+
+
+def test_failed_read_kt():
+    kt = session().read_kt("/tmp/missing.keytab").list()
+    stdout = _PROMPT * 3 + "slot KVNO Principal\n" + _PROMPT * 2
+    stderr = "\n".join([
+        'read_kt: No such file or directory while reading keytab '
+        '"/tmp/missing.keytab"',
+        unknown(_SYNC_MARKER.format(0)),
+        unknown(_SYNC_MARKER.format(1)),
+    ])
+    run(kt, stdout, stderr)
+
+    assert [result.index for result in kt.failures] == [0]
+    assert kt.error.startswith("read_kt: No such file or directory")
+    with pytest.raises(KtutilKeytabError) as error:
+        kt.raise_for_errors()
+    assert [result.index for result in error.value.results] == [0]
+
+
+def test_failed_addent_with_secret():
+    kt = session()
+    kt.add_entry("a@R", SECRET, 1, "bad-enctype")
+    kt.add_entry("a@R", SECRET, 1, "aes256-cts-hmac-sha1-96")
+    kt.write_kt("/tmp/out")
+
+    # The first ``addent`` rejects its enctype, so the password is read as
+    # a request, which adds a prompt and an error.
+    stdout = (
+        _PROMPT + _PROMPT + _PROMPT
+        + _PROMPT + "Password for a@R: " + _PROMPT
+        + _PROMPT + "written\n" + _PROMPT + _PROMPT)
+    stderr = "\n".join([
+        "addent: Bad encryption type while adding new entry",
+        unknown(SECRET),
+        unknown(_SYNC_MARKER.format(0)),
+        unknown(_SYNC_MARKER.format(1)),
+        unknown(_SYNC_MARKER.format(2)),
+    ])
+    run(kt, stdout, stderr)
+
+    for result in kt.results:
+        assert SECRET not in result.command
+        assert SECRET not in result.stdout
+        assert SECRET not in result.stderr
+    assert [result.index for result in kt.failures] == [0]
+    assert kt.results[1].stdout == "Password for a@R: "
+    assert kt.results[2].stdout == "written\n"
+    with pytest.raises(KtutilEntryError) as error:
+        kt.raise_for_errors()
+    assert SECRET not in str(error.value)
+
+
+def test_failed_addent_with_short_password():
+    kt = session().add_entry("a@R", "type", 1, "bad-enctype")
+    stdout = _PROMPT * 4
+    stderr = "\n".join([
+        "addent: Bad encryption type while adding new entry",
+        unknown("type"),
+        unknown(_SYNC_MARKER.format(0)),
+    ])
+    run(kt, stdout, stderr)
+
+    assert [result.index for result in kt.failures] == [0]
+    assert kt.error == "addent: Bad encryption type while adding new entry"
+    assert "Unknown request" not in kt.results[0].stderr
+    with pytest.raises(KtutilEntryError):
+        kt.raise_for_errors()
+
+
+def test_list_and_addent_with_short_password():
+    kt = session().read_kt("/tmp/jsmith.keytab")
+    kt.add_entry("jsmith@EXAMPLE.COM", "1", 2, "aes256-cts-hmac-sha1-96")
+    kt.list()
+    stdout = (
+        _PROMPT * 2
+        + _PROMPT + "Password for jsmith@EXAMPLE.COM: " + _PROMPT
+        + _PROMPT + LISTING
+        + "   2    2                                 jsmith@EXAMPLE.COM\n"
+        + _PROMPT * 2)
+    stderr = "\n".join(unknown(_SYNC_MARKER.format(i)) for i in range(3))
+    run(kt, stdout, stderr)
+
+    assert kt.failures == []
+    assert kt.keylist == [
+        {"slot": 1, "kvno": 1, "principal": "jsmith@EXAMPLE.COM"},
+        {"slot": 2, "kvno": 2, "principal": "jsmith@EXAMPLE.COM"}]
+
+
+def test_secret_not_read_without_other_error():
+    kt = session().add_entry("a@R", SECRET, 1, "aes256-cts-hmac-sha1-96")
+    stdout = _PROMPT * 4
+    stderr = "\n".join([unknown(SECRET), unknown(_SYNC_MARKER.format(0))])
+    run(kt, stdout, stderr)
+
+    assert kt.results[0].failed
+    assert SECRET not in kt.results[0].stderr
+    with pytest.raises(KtutilEntryError):
+        kt.raise_for_errors()
+
+
+def test_list_without_prompt():
+    kt = session().read_kt("/tmp/jsmith.keytab").list()
+    stderr = "\n".join(unknown(_SYNC_MARKER.format(i)) for i in range(2))
+    run(kt, LISTING, stderr)
+
+    assert kt.failures == []
+    assert kt.keylist == [
+        {"slot": 1, "kvno": 1, "principal": "jsmith@EXAMPLE.COM"}]
+
+
+def test_list_with_enctypes():
+    kt = session().read_kt("/tmp/jsmith.keytab").list(enctypes=True)
+    listing = (
+        "slot KVNO Principal\n"
+        "---- ---- ---------------------------------------------------------\n"
+        "   1    1      jsmith@EXAMPLE.COM (aes256-cts-hmac-sha1-96) \n"
+        "   2    1      jsmith@EXAMPLE.COM (aes128-cts-hmac-sha1-96) \n")
+    stdout = _PROMPT * 3 + listing + _PROMPT * 2
+    stderr = "\n".join(unknown(_SYNC_MARKER.format(i)) for i in range(2))
+    run(kt, stdout, stderr)
+
+    assert kt.results[1].command == "list -e"
+    assert kt.keylist == [
+        {"slot": 1, "kvno": 1, "principal": "jsmith@EXAMPLE.COM",
+         "enctype": "aes256-cts-hmac-sha1-96"},
+        {"slot": 2, "kvno": 1, "principal": "jsmith@EXAMPLE.COM",
+         "enctype": "aes128-cts-hmac-sha1-96"}]
@@ -0,0 +1,216 @@
+import os
+import json
+import stat
+
+import pytest
+
+from krb5ticket import ktutil, KeytabFileEmpty, KtutilKeytabError
+from krb5ticket import ktutil_rotation
+from krb5ticket.ktutil_rotation import rotate
+
+
+PRINCIPAL = "svc@EXAMPLE.COM"
+ENCTYPES = ["aes256-cts-hmac-sha1-96", "aes128-cts-hmac-sha1-96"]
+
+
+def keylist(*kvnos: int) -> list:
+    """
+    Returns a keylist with one entry per encryption type for each kvno.
+    """
+    keys = []
+    for kvno in kvnos:
+        for enctype in ENCTYPES:
+            keys.append({
+                "slot": len(keys) + 1,
+                "kvno": kvno,
+                "principal": PRINCIPAL,
+                "enctype": enctype})
+    return keys
+
+
+class FakeKtutil(ktutil):
+    """
+    ``ktutil`` session recording its commands instead of running them.
+    """
+    sessions = []
+    failing = set()
+
+    def __init__(self):
+        self._cursor = None
+        self.calls = []
+        FakeKtutil.sessions.append(self)
+
+    def read_kt(self, keytab_file):
+        self.keytab_file = keytab_file
+        self.calls.append(("read_kt", keytab_file))
+        return self
+
+    def delete_entry(self, slot):
+        self.calls.append(("delete_entry", slot))
+        return self
+
+    def add_entry(self, principal, password_or_key, kvno, enctype,
+                  type="password"):
+        self.calls.append(("addent", principal, password_or_key, kvno,
+                           enctype))
+        return self
+
+    def write_kt(self, keytab_file):
+        self.calls.append(("write_kt", keytab_file))
+        self.written = keytab_file
+        return self
+
+    def quit(self):
+        if self.keytab_file not in FakeKtutil.failing:
+            fd = os.open(self.written, os.O_CREAT | os.O_WRONLY, 0o600)
+            os.write(fd, b"rotated")
+            os.close(fd)
+
+    def raise_for_errors(self):
+        if self.keytab_file in FakeKtutil.failing:
+            raise KtutilKeytabError("write_kt: Permission denied", [])
+
+    def added(self) -> list:
+        return [call for call in self.calls if call[0] == "addent"]
+
+    def deleted(self) -> list:
+        return [call[1] for call in self.calls if call[0] == "delete_entry"]
+
+
+@pytest.fixture
+def keytabs(tmp_path, monkeypatch):
+    """
+    Returns a dictionary of keytab files and their current keylist.
+    """
+    keylists = {}
+    FakeKtutil.sessions = []
+    FakeKtutil.failing = set()
+    monkeypatch.setattr(ktutil_rotation, "ktutil", FakeKtutil)
+    monkeypatch.setattr(
+        ktutil_rotation, "_read_keylist", lambda path: keylists[path])
+    for name in ["a.keytab", "b.keytab"]:
+        path = tmp_path.joinpath(name)
+        path.write_bytes(b"original")
+        keylists[str(path)] = keylist(1, 2, 3)
+    return keylists
+
+
+@pytest.mark.parametrize("keep_versions, pruned", [
+    (2, [4, 3, 2, 1]),
+    (1, [6, 5, 4, 3, 2, 1]),
+])
+def test_plan_keep_versions(keytabs, keep_versions, pruned):
+    path = sorted(keytabs)[0]
+    report = rotate([path], "secret", keep_versions, dry_run=True)
+
+    result, = report.planned
+    assert result.kvnos == {PRINCIPAL: 4}
+    assert result.added == len(ENCTYPES)
+    assert result.pruned == pruned
+    assert FakeKtutil.sessions == []
+    assert open(path, "rb").read() == b"original"
+
+
+def test_rotate(keytabs):
+    path = sorted(keytabs)[0]
+    os.chmod(path, 0o640)
+    report = rotate([path, path], "secret", 2, workers=4)
+
+    result, = report.results
+    assert result.status == "rotated"
+    session, = FakeKtutil.sessions
+    assert session.deleted() == [4, 3, 2, 1]
+    assert session.added() == [
+        ("addent", PRINCIPAL, "secret", 4, enctype) for enctype in ENCTYPES]
+    assert open(path, "rb").read() == b"rotated"
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    assert sorted(os.listdir(os.path.dirname(path))) == [
+        "a.keytab", "b.keytab"]
+
+
+def test_rotate_with_enctypes(keytabs):
+    path = sorted(keytabs)[0]
+    rotate([path], "secret", enctypes=["aes256-cts-hmac-sha1-96"])
+
+    session, = FakeKtutil.sessions
+    assert session.added() == [
+        ("addent", PRINCIPAL, "secret", 4, "aes256-cts-hmac-sha1-96")]
+
+
+def test_rerun_with_kvnos(keytabs):
+    path = sorted(keytabs)[0]
+    keytabs[path] = keylist(2, 3, 4)
+    report = rotate([path], "secret", kvnos={PRINCIPAL: 4})
+
+    result, = report.skipped
+    assert result.kvnos == {PRINCIPAL: 4}
+    assert FakeKtutil.sessions == []
+
+
+def test_failed_write_kt(keytabs):
+    first, second = sorted(keytabs)
+    FakeKtutil.failing.add(second)
+    report = rotate([first, second], "secret")
+
+    assert [result.status for result in report.results] == [
+        "rotated", "failed"]
+    assert isinstance(report.failed[0].error, KtutilKeytabError)
+    assert report.failed_keytabs == [second]
+    assert open(second, "rb").read() == b"original"
+    assert sorted(os.listdir(os.path.dirname(second))) == [
+        "a.keytab", "b.keytab"]
+
+
+def test_rerun_with_state_file(keytabs, tmp_path):
+    first, second = sorted(keytabs)
+    state_file = str(tmp_path.joinpath("state", "rotation.json"))
+    os.mkdir(os.path.dirname(state_file))
+    FakeKtutil.failing.add(second)
+
+    report = rotate([first, second], "secret", state_file=state_file)
+    assert not report.ok
+    with open(state_file) as handle:
+        assert json.load(handle)["kvnos"] == {
+            first: {PRINCIPAL: 4}, second: {PRINCIPAL: 4}}
+
+    # The first keytab file was rotated, the same call must not bump it.
+    keytabs[first] = keylist(3, 4)
+    FakeKtutil.failing.clear()
+    FakeKtutil.sessions = []
+    report = rotate([first, second], "secret", state_file=state_file)
+
+    assert [result.status for result in report.results] == [
+        "skipped", "rotated"]
+    session, = FakeKtutil.sessions
+    assert session.keytab_file == second
+    assert not os.path.exists(state_file)
+
+
+def test_single_key_for_several_enctypes(keytabs):
+    path = sorted(keytabs)[0]
+    report = rotate([path], "0123abcd", entry_type="key")
+
+    assert isinstance(report.failed[0].error, ValueError)
+    assert FakeKtutil.sessions == []
+
+    keys = {enctype: f"key-{enctype}" for enctype in ENCTYPES}
+    report = rotate([path], keys, entry_type="key")
+
+    assert report.ok
+    session, = FakeKtutil.sessions
+    assert [call[2] for call in session.added()] == list(keys.values())
+
+
+def test_empty_keytab(keytabs):
+    path = sorted(keytabs)[0]
+    keytabs[path] = []
+    report = rotate([path], "secret")
+
+    assert isinstance(report.failed[0].error, KeytabFileEmpty)
+
+
+def test_missing_keytab(keytabs, tmp_path):
+    path = str(tmp_path.joinpath("missing.keytab"))
+    report = rotate([path], "secret")
+
+    assert report.failed_keytabs == [path]